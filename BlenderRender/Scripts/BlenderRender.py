@@ -246,6 +246,8 @@ class BlenderRenderClass(QWidget, BlenderRender_ui.Ui_wg_BlenderRender):
         self.cb_renderLayer.currentIndexChanged.connect(self.updateUi)
         self.chb_compositor.toggled.connect(self.stateManager.saveStatesToScene)            
         self.chb_persData.toggled.connect(self.stateManager.saveStatesToScene)              
+        self.chb_autoGPU.toggled.connect(self.stateManager.saveStatesToScene)              
+        self.chb_autoPersData.toggled.connect(self.stateManager.saveStatesToScene)              
         self.cb_format.currentIndexChanged.connect(self.setupFormatOptions)                 
         self.cb_format.activated.connect(self.stateManager.saveStatesToScene)
         self.cb_exrCodec.activated.connect(self.stateManager.saveStatesToScene)             
@@ -331,7 +333,9 @@ class BlenderRenderClass(QWidget, BlenderRender_ui.Ui_wg_BlenderRender):
                "PIZ:  lossless\n"
                "RLE:  lossless\n"
                "DWAA: lossy\n"
-               "DWAB: lossy"
+               "DWAB: lossy\n\n"
+               "ZipS is default and faster to read back in compositing.\n"
+               "DWAA/DWAB give smaller files for delivery."
               )
         self.cb_exrCodec.setToolTip(tip)
 
@@ -357,6 +361,17 @@ class BlenderRenderClass(QWidget, BlenderRender_ui.Ui_wg_BlenderRender):
               )
         self.chb_persData.setToolTip(tip)
 
+        tip = ("Turn on Persistent Data for multi-frame renders, even if unchecked above.\n"
+               "Scenes using motion blur keep the Persistent Data setting."
+              )
+        self.chb_autoPersData.setToolTip(tip)
+
+        tip = ("Render Cycles on the first available GPU (OptiX, CUDA, HIP, Metal, oneAPI).\n"
+               "Scenes already set to GPU, or with a GPU backend chosen in the\n"
+               "Preferences, are left as they are.  OSL scenes only switch to OptiX."
+              )
+        self.chb_autoGPU.setToolTip(tip)
+
         tip = "Toggle to use an Alpha channel."
         self.chb_alpha.setToolTip(tip)
 
@@ -466,7 +481,10 @@ class BlenderRenderClass(QWidget, BlenderRender_ui.Ui_wg_BlenderRender):
         if "outputFormat" in data:
             idx = self.cb_format.findText(data["outputFormat"])
             if idx != -1:
+                #   Signals blocked as setupFormatOptions is called once below
+                wasBlocked = self.cb_format.blockSignals(True)
                 self.cb_format.setCurrentIndex(idx)
+                self.cb_format.blockSignals(wasBlocked)
 
         self.setupFormatOptions(mode="Load")                                
 
@@ -500,6 +518,12 @@ class BlenderRenderClass(QWidget, BlenderRender_ui.Ui_wg_BlenderRender):
         if "persData" in data:                                              
             self.chb_persData.setChecked(data["persData"])     
 
+        if "autoGPU" in data:
+            self.chb_autoGPU.setChecked(data["autoGPU"])
+
+        if "autoPersData" in data:
+            self.chb_autoPersData.setChecked(data["autoPersData"])
+
         if "submitrender" in data:
             self.gb_submit.setChecked(eval(data["submitrender"]))
 
@@ -591,7 +615,7 @@ class BlenderRenderClass(QWidget, BlenderRender_ui.Ui_wg_BlenderRender):
         #   Options for new instance of BlenderRender
         newOptions = {                                                    
             "format": ".exr",                                                       
-            "codec": "DWAA",
+            "codec": "ZIPS",
             "bitDepth": "16",
             "useAlpha": True
         }
@@ -688,23 +712,26 @@ class BlenderRenderClass(QWidget, BlenderRender_ui.Ui_wg_BlenderRender):
             widget.hide()
 
         if mode in ["New", "Load"]:
-            for fullFormat in self.formatOptions:
+            for fullFormat, fmtOptions in self.formatOptions.items():
                 format = fullFormat.strip('.')
                 if format == "exrMulti":
                     format = "exr"
                 
-                if "bitDepths" in self.formatOptions[fullFormat]:
+                if "bitDepths" in fmtOptions:
                     bitDepthComboBox = getattr(self, f"cb_{format}BitDepth")
                     bitDepthComboBox.clear()
-                    bitDepthComboBox.addItems(self.formatOptions[fullFormat]["bitDepths"])
+                    bitDepthComboBox.addItems(fmtOptions["bitDepths"])
 
-                if "codec" in self.formatOptions[fullFormat]:
+                if "codec" in fmtOptions:
                     codecComboBox = getattr(self, f"cb_{format}Codec")
                     codecComboBox.clear()
-                    codecComboBox.addItems(self.formatOptions[fullFormat]["codec"])
+                    codecComboBox.addItems(fmtOptions["codec"])
 
         if mode == "New":
+            #   Blocked to not re-enter setupFormatOptions from currentIndexChanged
+            wasBlocked = self.cb_format.blockSignals(True)
             self.cb_format.setCurrentIndex(self.cb_format.findText(loadOptions.get("format", "")))
+            self.cb_format.blockSignals(wasBlocked)
             self.cb_exrCodec.setCurrentIndex(self.cb_exrCodec.findText(loadOptions.get("codec", "")))
             self.cb_exrBitDepth.setCurrentIndex(self.cb_exrBitDepth.findText(loadOptions.get("bitDepth", "")))
             self.chb_alpha.setChecked(bool(loadOptions.get("useAlpha", "")))
@@ -1446,9 +1473,11 @@ class BlenderRenderClass(QWidget, BlenderRender_ui.Ui_wg_BlenderRender):
         self.il.tw_steps.doubleClicked.connect(self.il.accept)
         self.il.tw_steps.horizontalHeaderItem(0).setText("Name")
         self.il.tw_steps.setColumnHidden(1, True)
-        for i in sorted(steps, key=lambda s: s.lower()):
-            rc = self.il.tw_steps.rowCount()
-            self.il.tw_steps.insertRow(rc)
+
+        #   Sizes the table once instead of inserting a row per pass
+        sortedSteps = sorted(steps, key=lambda s: s.lower())
+        self.il.tw_steps.setRowCount(len(sortedSteps))
+        for rc, i in enumerate(sortedSteps):
             item1 = QTableWidgetItem(i)
             self.il.tw_steps.setItem(rc, 0, item1)
 
@@ -1720,6 +1749,8 @@ class BlenderRenderClass(QWidget, BlenderRender_ui.Ui_wg_BlenderRender):
                 "useAlpha": self.chb_alpha.isChecked(),                     
                 "useComp": self.chb_compositor.isChecked(),                 
                 "persData": self.chb_persData.isChecked(),
+                "autoGPU": self.chb_autoGPU.isChecked(),
+                "autoPersData": self.chb_autoPersData.isChecked(),
                 "aovPasses": passList                   
                 }
 
@@ -1900,6 +1931,8 @@ class BlenderRenderClass(QWidget, BlenderRender_ui.Ui_wg_BlenderRender):
             "renderlayer": str(self.cb_renderLayer.currentText()),
             "useComp": self.chb_compositor.isChecked(),                         
             "persData": self.chb_persData.isChecked(),                          
+            "autoGPU": self.chb_autoGPU.isChecked(),
+            "autoPersData": self.chb_autoPersData.isChecked(),
             "outputFormat": str(self.cb_format.currentText()),
             "codec": self.cb_exrCodec.currentText(),                            
             "exrBitDepth": self.cb_exrBitDepth.currentText(),                   
@@ -49,15 +49,26 @@
 
 import os
 import sys
-import platform
+import glob
 import time
+import math
+import shutil
+import tempfile
+import threading
 import traceback
 import logging
+import operator
+from collections import defaultdict
 
 from qtpy.QtCore import *
 from qtpy.QtGui import *
 from qtpy.QtWidgets import *
 
+#   Only available when running inside Blender
+try:
+    import bpy
+except ImportError:
+    bpy = None
 
 from PrismUtils.Decorators import err_catcher_plugin as err_catcher
 from BlenderRender import BlenderRenderClass
@@ -65,14 +76,225 @@ from BlenderRender import BlenderRenderClass
 logger = logging.getLogger(__name__)
 
 
+#   Blender file formats keyed by the state's output extension (lower-case, no dot)
+BLEND_FILE_FORMATS = {
+    "exr": "OPEN_EXR",
+    "exrmulti": "OPEN_EXR_MULTILAYER",
+    "png": "PNG",
+    "jpg": "JPEG",
+    "jpeg": "JPEG",
+    }
+
+#   File extensions for Blender file formats used by File Output nodes
+BLEND_FORMAT_EXTENSIONS = {
+    "PNG": ".png",
+    "JPEG": ".jpg",
+    "JPEG2000": "jpg",
+    "TARGA": ".tga",
+    "TARGA_RAW": ".tga",
+    "OPEN_EXR_MULTILAYER": ".exr",
+    "OPEN_EXR": ".exr",
+    "TIFF": ".tif",
+    }
+
+#   Render settings restored after rendering: (rSettings key, owner, attribute).
+#   Order matters as origImageformat must be applied after fileformat, and
+#   origMediaType before both as it limits the available file formats.
+UNDO_RENDER_SETTINGS = (
+    ("origMediaType", "imgSettings", "media_type"),
+    ("width", "render", "resolution_x"),
+    ("height", "render", "resolution_y"),
+    ("prev_start", "scene", "frame_start"),
+    ("prev_end", "scene", "frame_end"),
+    ("fileformat", "imgSettings", "file_format"),
+    ("overwrite", "render", "use_overwrite"),
+    ("fileextension", "render", "use_file_extension"),
+    ("resolutionpercent", "render", "resolution_percentage"),
+    ("origSamples", "cycles", "samples"),
+    ("origPersData", "render", "use_persistent_data"),
+    ("origUseComp", "render", "use_compositing"),
+    ("origUseNode", "scene", "use_nodes"),
+    ("origImageformat", "imgSettings", "file_format"),
+    ("origExrCodec", "imgSettings", "exr_codec"),
+    ("origBitDepth", "imgSettings", "color_depth"),
+    ("origAlpha", "imgSettings", "color_mode"),
+    )
+
+IS_WINDOWS = sys.platform.startswith("win")
+
+#   Temp folder for the beauty output when passes go through File Output nodes (Windows only)
+PRISM_TEMP_DIR = os.path.join(tempfile.gettempdir(), "PrismRender")
+
+#   Cycles GPU backends in order of preference for the automatic device setup
+CYCLES_GPU_BACKENDS = ("OPTIX", "CUDA", "HIP", "METAL", "ONEAPI")
+
+#   Available AOVs per (view layer, Blender version).  Cleared when a scenefile is loaded.
+availableAOVsCache = {}
+#   Same AOVs keyed by name, built alongside availableAOVsCache
+availableAOVsByName = {}
+
+
 def renderFinished_handler(dummy):
 
-    import bpy
-    bpy.context.scene["PrismIsRendering"] = False
+    #   Skip the ID-property write if the flag is already cleared
+    scene = bpy.context.scene
+    if scene.get("PrismIsRendering"):
+        scene["PrismIsRendering"] = False
+
+
+def clearAOVCache_handler(dummy):
+
+    availableAOVsCache.clear()
+    availableAOVsByName.clear()
+
+
+def setIfChanged(obj, attr, val):
+
+    #   Skips no-op RNA writes so their update callbacks do not fire
+    if getattr(obj, attr) != val:
+        setattr(obj, attr, val)
+
+
+def isEmptyDir(path):
+
+    #   Stops at the first entry.  A missing or unreadable folder is not empty.
+    try:
+        with os.scandir(path) as entries:
+            return next(entries, None) is None
+    except OSError:
+        return False
+
+
+def removeDirs(paths):
+
+    for path in paths:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def removeDirAsync(path):
+
+    #   Renames the folder first so a new render can recreate it right away,
+    #   then deletes it without blocking the UI.  Renamed folders left over
+    #   from an earlier cleanup (Blender closed, locked files) are retried too.
+    if os.path.exists(path):
+        trashDir = "%s_old_%s" % (path, time.time_ns())
+        try:
+            os.rename(path, trashDir)
+        except OSError as e:
+            logger.warning(f"Unable to rename {path} for removal, removing in place: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+
+    oldDirs = glob.glob(glob.escape(path) + "_old_*")
+    if not oldDirs:
+        return
+
+    threading.Thread(target=removeDirs, args=(oldDirs,), daemon=True).start()
+
+
+def attrSetter(parm):
+
+    #   Setter counterpart of operator.attrgetter for a dotted attribute path
+    parent, _, leaf = parm.rpartition(".")
+    if not parent:
+        return lambda obj, val: setattr(obj, leaf, val)
+
+    getParent = operator.attrgetter(parent)
+    return lambda obj, val: setattr(getParent(obj), leaf, val)
+
+
+def iterPassParms(layer):
+
+    #   Yields (parm path, attribute name) for each use_pass_* toggle of a view layer
+    for attr in dir(layer):
+        if attr.startswith("use_pass_"):
+            yield attr, attr
+
+    for attr in dir(layer.cycles):
+        if attr.startswith("use_pass_"):
+            yield "cycles." + attr, attr
+
+
+def buildLinkIndex(tree):
+
+    #   Maps (node name, socket identifier) to its links for both link ends.
+    #   Reading socket.links walks every link in the tree on each access.
+    outLinks = defaultdict(list)
+    inLinks = defaultdict(list)
+
+    for link in tree.links:
+        #   socket.links leaves out links from unavailable sockets, such as
+        #   outputs of passes that are turned off, so the index does too.
+        if getattr(link, "is_hidden", False):
+            continue
+
+        outLinks[(link.from_node.name, link.from_socket.identifier)].append(link)
+        inLinks[(link.to_node.name, link.to_socket.identifier)].append(link)
+
+    return outLinks, inLinks
+
+
+def applyExrSettings(imgSettings, rSettings, alpha):
+
+    setIfChanged(imgSettings, "exr_codec", rSettings["exrCodec"])
+    setIfChanged(imgSettings, "color_depth", rSettings["exrBitDepth"])
+    setIfChanged(imgSettings, "color_mode", alpha)
+
+
+def applyPngSettings(imgSettings, rSettings, alpha):
+
+    setIfChanged(imgSettings, "color_depth", rSettings["pngBitDepth"])
+    setIfChanged(imgSettings, "compression", rSettings["pngCompress"])
+    setIfChanged(imgSettings, "color_mode", alpha)
+
+
+def applyJpgSettings(imgSettings, rSettings, alpha):
+
+    setIfChanged(imgSettings, "quality", rSettings["jpegQual"])
+
+
+#   State format to the function applying its options, used by setTempScene.
+#   The Blender file_format itself comes from BLEND_FILE_FORMATS.
+TEMP_SCENE_FORMATS = {
+    ".exr": applyExrSettings,
+    ".exrMulti": applyExrSettings,
+    ".png": applyPngSettings,
+    ".jpg": applyJpgSettings,
+    }
+
+#   Image settings media_type per state format, "IMAGE" for the others (Blender 4.5+)
+TEMP_SCENE_MEDIA_TYPES = {
+    ".exrMulti": "MULTI_LAYER_IMAGE",
+    }
 
 
 
 class Prism_BlenderRender_Functions(object):
+
+    #   Functions in Prism_Blender_Functions.py to be patched
+    patchList = ["setFPS",
+                 "sm_render_refreshPasses", 
+                 "getViewLayerAOVs",
+                 "getAvailableAOVs",
+                 "removeAOV",
+                 "enableViewLayerAOV",
+                 "sm_render_preSubmit",
+                 "sm_render_startLocalRender",
+                 "sm_render_undoRenderSettings",
+                 "sm_render_getRenderPasses",
+                 "sm_render_addRenderPass",
+                 "sm_render_getDeadlineParams"
+                 ]
+
+    #   Methods added to the Blender plugin
+    addFuncList = ["getRenderSamples",
+                   "useCompositor",
+                   "getPersistantData",
+                   "getRenderLayers",
+                   "setTempScene",
+                   "nextRenderslot",
+                   "setupLayers"]
+
+
     def __init__(self, core, plugin):
         self.core = core
         self.plugin = plugin
@@ -81,6 +303,10 @@ class Prism_BlenderRender_Functions(object):
         self.core.registerCallback("pluginLoaded", self.onPluginLoaded, plugin=self)
 
         self.blendPlugin = self.core.getPlugin("Blender")
+        self.useNodesSupported = None
+        self.compGroupSupported = None
+        self.mediaTypeSupported = None
+        self.blendPatched = False
         self.applyBlendPatch()
 
 
@@ -100,29 +326,18 @@ class Prism_BlenderRender_Functions(object):
     @err_catcher(name=__name__)
     def applyBlendPatch(self):
 
+        #   Already patched, as onPluginLoaded calls this again after __init__
+        if self.blendPatched and getattr(self.blendPlugin, "setTempScene", None) == self.setTempScene:
+            return
+
         #   Ensures it is not using the Blender_unloaded plugin
         if hasattr(self.blendPlugin, "startup"):
             # try:
 
             logger.debug("*** Patching Blender Plugin ***")
             
-            #   Functions in Prism_Blender_Functions.py to be patched
-            patchList = ["setFPS",
-                         "sm_render_refreshPasses", 
-                         "getViewLayerAOVs",
-                         "getAvailableAOVs",
-                         "removeAOV",
-                         "enableViewLayerAOV",
-                         "sm_render_preSubmit",
-                         "sm_render_startLocalRender",
-                         "sm_render_undoRenderSettings",
-                         "sm_render_getRenderPasses",
-                         "sm_render_addRenderPass",
-                         "sm_render_getDeadlineParams"
-                         ]
-            
             #   Iterate through list and patches each
-            for patch in patchList:
+            for patch in self.patchList:
                 try:
                     origFunc = getattr(self.blendPlugin, patch)
                     patchedFunc = getattr(self, patch)
@@ -134,16 +349,8 @@ class Prism_BlenderRender_Functions(object):
                     logger.warning(f"Unable to patch: {patch}\n"
                                    f"      {e}")
 
-            addFuncList = ["getRenderSamples",
-                           "useCompositor",
-                           "getPersistantData",
-                           "getRenderLayers",
-                           "setTempScene",
-                           "nextRenderslot",
-                           "setupLayers"]
-            
             #   Iterate through list and adds each
-            for func in addFuncList:
+            for func in self.addFuncList:
                 try:
                     addedFunc = getattr(self, func)
                     setattr(self.blendPlugin, func, addedFunc)
@@ -152,6 +359,13 @@ class Prism_BlenderRender_Functions(object):
                 except Exception as e:
                     logger.warning(f"Unable to add method: {func}\n"
                                    f"      {e}")
+
+            #   Clears the cached AOV lists when a new scenefile is loaded
+            handler = bpy.app.handlers.persistent(clearAOVCache_handler)
+            if handler not in bpy.app.handlers.load_post:
+                bpy.app.handlers.load_post.append(handler)
+
+            self.blendPatched = True
  
 
     @err_catcher(name=__name__)
@@ -178,8 +392,6 @@ class Prism_BlenderRender_Functions(object):
     @err_catcher(name=__name__)
     def setFPS(self, origin, fps):
 
-        import bpy, math                                                        #   ADDED
-
         if isinstance(fps, int):                                                #   EDITED to fix FPS check
             bpy.context.scene.render.fps = fps                                  #   EDITED
         else:
@@ -208,15 +420,16 @@ class Prism_BlenderRender_Functions(object):
     @err_catcher(name=__name__)
     def getViewLayerAOVs(self, renderLayer):                                    #   EDITED
 
-        import bpy, operator                                                    #   ADDED
-
         availableAOVs = self.getAvailableAOVs(renderLayer)                      #   EDITED
-        curlayer = bpy.context.scene.view_layers[renderLayer]                   #   EDITED
+        curlayer = self.getViewLayer(renderLayer)                               #   EDITED
+        if curlayer is None:                                                    #   ADDED
+            return []
+
         aovNames = []
         for aa in availableAOVs:
             val = None
             try:
-                val = operator.attrgetter(aa["parm"])(curlayer)
+                val = aa["getter"](curlayer)                                    #   EDITED
             except AttributeError:
                 logging.debug("Couldn't access aov %s" % aa["parm"])
                 pass
@@ -230,13 +443,36 @@ class Prism_BlenderRender_Functions(object):
     @err_catcher(name=__name__)                 
     def getAvailableAOVs(self, renderLayer):                                        #   EDITED
 
-        import bpy                                                                  #   ADDED
+        #   The available passes only change with the Blender version, so the
+        #   dir() scan is done once per layer and reused.
+        cacheKey = (renderLayer, bpy.app.version[:2])                               #   ADDED
+        if cacheKey not in availableAOVsCache:
+            aovs = self.computeAvailableAOVs(renderLayer)
+            if not aovs:
+                return aovs
+
+            availableAOVsCache[cacheKey] = aovs
+            availableAOVsByName[cacheKey] = {aov["name"]: aov for aov in aovs}
+
+        return availableAOVsCache[cacheKey]
+
+
+    @err_catcher(name=__name__)                                                     #   ADDED
+    def getAvailableAOV(self, name, renderLayer):
+
+        #   Looks up a single available AOV by name, None if it does not exist
+        self.getAvailableAOVs(renderLayer)
+        cacheKey = (renderLayer, bpy.app.version[:2])
+        return availableAOVsByName.get(cacheKey, {}).get(name)
+
+
+    @err_catcher(name=__name__)                                                     #   ADDED
+    def computeAvailableAOVs(self, renderLayer):
+
+        curlayer = self.getViewLayer(renderLayer)                                   #   EDITED
+        if curlayer is None:
+            return []
 
-        curlayer = bpy.context.scene.view_layers[renderLayer]                       #   EDITED
-        aovParms = [x for x in dir(curlayer) if x.startswith("use_pass_")]
-        aovParms += [
-            "cycles." + x for x in dir(curlayer.cycles) if x.startswith("use_pass_")
-        ]
         aovs = [
             {"name": "Denoising Data", "parm": "cycles.denoising_store_passes"},
             {"name": "Render Time", "parm": "cycles.pass_debug_render_time"},
@@ -244,14 +480,16 @@ class Prism_BlenderRender_Functions(object):
         nameOverrides = {
             "Emit": "Emission",
         }
-        for aov in aovParms:
-            name = aov.replace("use_pass_", "").replace("cycles.", "")
-            name = [x[0].upper() + x[1:] for x in name.split("_")]
-            name = " ".join(name)
-            name = nameOverrides[name] if name in nameOverrides else name
-            aovs.append({"name": name, "parm": aov})
+        for aov, passAttr in iterPassParms(curlayer):                               #   EDITED
+            name = passAttr[len("use_pass_"):].replace("_", " ").title()
+            aovs.append({"name": nameOverrides.get(name, name), "parm": aov})
+
+        aovs.sort(key=lambda x: x["name"])
 
-        aovs = sorted(aovs, key=lambda x: x["name"])
+        #   Accessors are built once here and reused when reading or toggling AOVs
+        for aov in aovs:
+            aov["getter"] = operator.attrgetter(aov["parm"])
+            aov["setter"] = attrSetter(aov["parm"])
 
         return aovs
 
@@ -259,40 +497,43 @@ class Prism_BlenderRender_Functions(object):
     @err_catcher(name=__name__)
     def removeAOV(self, aovName, renderLayer):                                      #   EDITED
 
-        import bpy                                                                  #   ADDED
-
         if self.blendPlugin.useNodeAOVs():                                          #   EDITED
+            compTree = self.getCompNodeTree()                                           #   ADDED
             rlayerNodes = [
-                x for x in bpy.context.scene.node_tree.nodes if x.type == "R_LAYERS"
+                x for x in compTree.nodes if x.type == "R_LAYERS"                       #   EDITED
             ]
+            outLinks, inLinks = buildLinkIndex(compTree)                                #   ADDED
 
             for m in rlayerNodes:
-                connections = []
+                #   All File Output nodes fed by this layer node, not only the
+                #   one connected to its first linked output.
+                outputNodes = []                                                        #   EDITED
                 for i in m.outputs:
-                    if len(list(i.links)) > 0:
-                        connections.append(i.links[0])
-                        break
-
-                for i in connections:
-                    if i.to_node.type == "OUTPUT_FILE":
-                        for idx, k in enumerate(i.to_node.file_slots):
-                            links = i.to_node.inputs[idx].links
-                            if len(links) > 0:
-                                if links[0].from_socket.node != m:
-                                    continue
-
-                                passName = links[0].from_socket.name
-                                layerName = links[0].from_socket.node.layer
-
-                                if passName == "Image":
-                                    passName = "beauty"
-
-                                if (
-                                    passName == aovName.split("_", 1)[1]
-                                    and layerName == aovName.split("_", 1)[0]
-                                ):
-                                    i.to_node.inputs.remove(i.to_node.inputs[idx])
-                                    return
+                    for link in outLinks.get((m.name, i.identifier), []):
+                        toNode = link.to_node
+                        if toNode.type == "OUTPUT_FILE" and toNode not in outputNodes:
+                            outputNodes.append(toNode)
+
+                for outNode in outputNodes:
+                    for idx, k in enumerate(outNode.file_slots):
+                        inSocket = outNode.inputs[idx]                                  #   EDITED
+                        links = inLinks.get((outNode.name, inSocket.identifier), [])
+                        if links:
+                            if links[0].from_socket.node != m:
+                                continue
+
+                            passName = links[0].from_socket.name
+                            layerName = links[0].from_socket.node.layer
+
+                            if passName == "Image":
+                                passName = "beauty"
+
+                            if (
+                                passName == aovName.split("_", 1)[1]
+                                and layerName == aovName.split("_", 1)[0]
+                            ):
+                                outNode.inputs.remove(inSocket)
+                                return
         else:
             self.enableViewLayerAOV(aovName, renderLayer, enable=False)             #   EDITED
 
@@ -300,34 +541,29 @@ class Prism_BlenderRender_Functions(object):
     @err_catcher(name=__name__)
     def enableViewLayerAOV(self, name, renderLayer, enable=True):                   #   EDITED
 
-        import bpy                                                                  #   EDITED
-
-        aa = self.getAvailableAOVs(renderLayer)                                     #   EDITED
-        curAOV = [x for x in aa if x["name"] == name]
-        if not curAOV:
+        curAOV = self.getAvailableAOV(name, renderLayer)                            #   EDITED
+        if curAOV is None:                                                          #   EDITED
             return
 
-        curAOV = curAOV[0]
-        curlayer = bpy.context.scene.view_layers[renderLayer]                       #   EDITED
-
-        attrs = curAOV["parm"].split(".")
-        obj = curlayer
-        for a in attrs[:-1]:
-            obj = getattr(obj, a)
+        curlayer = self.getViewLayer(renderLayer)                                   #   EDITED
+        if curlayer is None:                                                        #   ADDED
+            return
 
-        setattr(obj, attrs[-1], enable)
+        curAOV["setter"](curlayer, enable)                                          #   EDITED
 
 
     @err_catcher(name=__name__)
     def sm_render_preSubmit(self, origin, rSettings):
 
-        import bpy                                                                      #   ADDED
+        scene = bpy.context.scene                                                       #   ADDED
+        render = scene.render                                                           #   ADDED
+        imgSettings = render.image_settings                                             #   ADDED
 
         if origin.chb_resOverride.isChecked():
-            rSettings["width"] = bpy.context.scene.render.resolution_x
-            rSettings["height"] = bpy.context.scene.render.resolution_y
-            bpy.context.scene.render.resolution_x = origin.sp_resWidth.value()
-            bpy.context.scene.render.resolution_y = origin.sp_resHeight.value()
+            rSettings["width"] = render.resolution_x
+            rSettings["height"] = render.resolution_y
+            render.resolution_x = origin.sp_resWidth.value()
+            render.resolution_y = origin.sp_resHeight.value()
 
         nodeAOVs = self.blendPlugin.getNodeAOVs()                                       #   EDITED
         imgFormat = origin.cb_format.currentText()
@@ -337,21 +573,14 @@ class Prism_BlenderRender_Functions(object):
         #     else:
         #         fileFormat = "OPEN_EXR"
 
-        if imgFormat == ".exr":                                                         #   EDITED
-            fileFormat = "OPEN_EXR"                                                     
-        elif imgFormat == ".exrMulti":
-            fileFormat = "OPEN_EXR_MULTILAYER"
-        elif imgFormat == ".png":
-            fileFormat = "PNG"
-        elif imgFormat == ".jpg":
-            fileFormat = "JPEG"
+        fileFormat = BLEND_FILE_FORMATS.get(imgFormat.lstrip(".").lower(), "PNG")       #   EDITED
 
-        rSettings["prev_start"] = bpy.context.scene.frame_start
-        rSettings["prev_end"] = bpy.context.scene.frame_end
-        rSettings["fileformat"] = bpy.context.scene.render.image_settings.file_format
-        rSettings["overwrite"] = bpy.context.scene.render.use_overwrite
-        rSettings["fileextension"] = bpy.context.scene.render.use_file_extension
-        rSettings["resolutionpercent"] = bpy.context.scene.render.resolution_percentage
+        rSettings["prev_start"] = scene.frame_start
+        rSettings["prev_end"] = scene.frame_end
+        rSettings["fileformat"] = imgSettings.file_format
+        rSettings["overwrite"] = render.use_overwrite
+        rSettings["fileextension"] = render.use_file_extension
+        rSettings["resolutionpercent"] = render.resolution_percentage
 
 
 
@@ -359,21 +588,24 @@ class Prism_BlenderRender_Functions(object):
 #################################################################################
 #    vvvvvvvvvvvvvvvvvvvvv           ADDED         vvvvvvvvvvvvvvvvvvvvvvvvvvvvvv
 
-        rSettings["origSamples"] = bpy.context.scene.cycles.samples
-        rSettings["origImageformat"] = bpy.context.scene.render.image_settings.file_format
-        rSettings["origExrCodec"] = bpy.context.scene.render.image_settings.exr_codec
-        rSettings["origBitDepth"] = bpy.context.scene.render.image_settings.color_depth
-        rSettings["origAlpha"] = bpy.context.scene.render.image_settings.color_mode
-        rSettings["origPersData"] = bpy.context.scene.render.use_persistent_data
-        rSettings["origUseComp"] = bpy.context.scene.render.use_compositing
-        rSettings["origUseNode"] = bpy.context.scene.use_nodes
+        rSettings["origSamples"] = scene.cycles.samples
+        rSettings["origImageformat"] = imgSettings.file_format
+        rSettings["origExrCodec"] = imgSettings.exr_codec
+        rSettings["origBitDepth"] = imgSettings.color_depth
+        rSettings["origAlpha"] = imgSettings.color_mode
+        rSettings["origPersData"] = render.use_persistent_data
+        rSettings["origUseComp"] = render.use_compositing
+        if self.hasUseNodes():
+            rSettings["origUseNode"] = scene.use_nodes
+        if self.hasMediaType():
+            rSettings["origMediaType"] = imgSettings.media_type
 
 
         self.blendPlugin.setTempScene(rSettings, origin)    
 
 
 
-        rSettings = self.blendPlugin.setupLayers(rSettings, mode="Set")
+        rSettings = self.setRenderLayers(rSettings)
 
 
         aovName = rSettings["aovName"]
@@ -392,30 +624,46 @@ class Prism_BlenderRender_Functions(object):
 
 
         rSettings["origOutputName"] = rSettings["outputName"]
-        bpy.context.scene["PrismIsRendering"] = True
-        bpy.context.scene.render.filepath = rSettings["outputName"]
-        bpy.context.scene.render.image_settings.file_format = fileFormat
-        bpy.context.scene.render.use_overwrite = True
-        bpy.context.scene.render.use_file_extension = False
+        scene["PrismIsRendering"] = True
+        render.filepath = rSettings["outputName"]
+        imgSettings.file_format = fileFormat
+        render.use_overwrite = True
+        render.use_file_extension = False
         # bpy.context.scene.render.resolution_percentage = 100                      #   COMMENTED OUT FOR TEMP SCENE
-        bpy.context.scene.camera = bpy.context.scene.objects[origin.curCam]
+        scene.camera = scene.objects[origin.curCam]
 
         usePasses = False
         if self.blendPlugin.useNodeAOVs():                                          #   EDITED
-            outNodes = [
-                x for x in bpy.context.scene.node_tree.nodes if x.type == "OUTPUT_FILE"
-            ]
-            rlayerNodes = [
-                x for x in bpy.context.scene.node_tree.nodes if x.type == "R_LAYERS"
-            ]
+            compTree = self.getCompNodeTree()                                           #   ADDED
+
+            #   Sorts the nodes in a single pass over the tree
+            outNodes = []
+            rlayerNodes = []
+            for node in compTree.nodes:
+                nodeType = node.type
+                if nodeType == "OUTPUT_FILE":
+                    outNodes.append(node)
+                elif nodeType == "R_LAYERS":
+                    rlayerNodes.append(node)
+
+            multiLayer = len(rlayerNodes) > 1
+
+            inLinks = buildLinkIndex(compTree)[1]                                       #   ADDED
+
+            #   Output path parts that do not change per connection
+            outName = rSettings["outputName"]
+            outDir = os.path.dirname(outName)
+            outDirParent = os.path.abspath(os.path.join(outName, "../.."))
+            outStem = os.path.splitext(os.path.basename(outName))[0]
 
             for m in outNodes:
                 connections = []
                 for idx, i in enumerate(m.inputs):
-                    if len(list(i.links)) > 0:
-                        connections.append([i.links[0], idx])
+                    links = inLinks.get((m.name, i.identifier))                         #   EDITED
+                    if links:
+                        connections.append([links[0], idx])
 
-                m.base_path = os.path.dirname(rSettings["outputName"])
+                m.base_path = outDir                                                    #   EDITED
 
                 for i, idx in connections:
                     passName = i.from_socket.name
@@ -424,66 +672,36 @@ class Prism_BlenderRender_Functions(object):
                         passName = "beauty"
 
                     if i.from_node.type == "R_LAYERS":
-                        if len(rlayerNodes) > 1:
+                        if multiLayer:                                                  #   EDITED
                             passName = "%s_%s" % (i.from_node.layer, passName)
 
                     else:
                         if hasattr(i.from_node, "label") and i.from_node.label != "":
                             passName = i.from_node.label
 
-                    extensions = {
-                        "PNG": ".png",
-                        "JPEG": ".jpg",
-                        "JPEG2000": "jpg",
-                        "TARGA": ".tga",
-                        "TARGA_RAW": ".tga",
-                        "OPEN_EXR_MULTILAYER": ".exr",
-                        "OPEN_EXR": ".exr",
-                        "TIFF": ".tif",
-                    }
-                    nodeExt = extensions[m.format.file_format]
+                    nodeExt = BLEND_FORMAT_EXTENSIONS[m.format.file_format]                 #   EDITED
                     curSlot = m.file_slots[idx]
                     if curSlot.use_node_format:
                         ext = nodeExt
                     else:
-                        ext = extensions[curSlot.format.file_format]
-
-                    curSlot.path = "../%s/%s" % (
-                        passName,
-                        os.path.splitext(os.path.basename(rSettings["outputName"]))[
-                            0
-                        ].replace("beauty", passName)
-                        + ext,
-                    )
-                    newOutputPath = os.path.abspath(
-                        os.path.join(
-                            rSettings["outputName"],
-                            "../..",
-                            passName,
-                            os.path.splitext(os.path.basename(rSettings["outputName"]))[
-                                0
-                            ].replace("beauty", passName)
-                            + ext,
-                        )
-                    )
+                        ext = BLEND_FORMAT_EXTENSIONS[curSlot.format.file_format]           #   EDITED
+
+                    fileName = outStem.replace("beauty", passName) + ext                #   EDITED
+                    curSlot.path = "../%s/%s" % (passName, fileName)                    #   EDITED
+                    newOutputPath = os.path.join(outDirParent, passName, fileName)      #   EDITED
                     usePasses = True
 
         if usePasses:
             rSettings["outputName"] = newOutputPath
-            if platform.system() == "Windows":
-                tmpOutput = os.path.join(
-                    os.environ["temp"], "PrismRender", "tmp.####" + imgFormat
-                )
-                bpy.context.scene.render.filepath = tmpOutput
-                if not os.path.exists(os.path.dirname(tmpOutput)):
-                    os.makedirs(os.path.dirname(tmpOutput))
+            if IS_WINDOWS:                                                              #   EDITED
+                tmpOutput = os.path.join(PRISM_TEMP_DIR, "tmp.####" + imgFormat)        #   EDITED
+                render.filepath = tmpOutput
+                os.makedirs(PRISM_TEMP_DIR, exist_ok=True)                              #   EDITED
 
 
     @err_catcher(name=__name__)
     def sm_render_startLocalRender(self, origin, outputName, rSettings):
 
-        import bpy                                                                          #   ADDED
-
         # renderAnim = bpy.context.scene.frame_start != bpy.context.scene.frame_end         #   COMMENTED FROM PRISM
         try:
             if not origin.renderingStarted:
@@ -499,8 +717,10 @@ class Prism_BlenderRender_Functions(object):
                 #    QCoreApplication.processEvents()
 
 
-                bpy.app.handlers.render_complete.append(renderFinished_handler)
-                bpy.app.handlers.render_cancel.append(renderFinished_handler)
+                #   Register the handlers only once per session                     #   EDITED
+                for handlers in (bpy.app.handlers.render_complete, bpy.app.handlers.render_cancel):
+                    if renderFinished_handler not in handlers:
+                        handlers.append(renderFinished_handler)
 
                 self.renderedChunks = []
 
@@ -517,46 +737,42 @@ class Prism_BlenderRender_Functions(object):
 #    vvvvvvvvvvvvvvvvvvvvv           ADDED         vvvvvvvvvvvvvvvvvvvvvvvvvvvvvv
 
             #   Adds modified scene options to ctx context for local render.
+            scene = ctx['scene']
+            render = scene.render
+            imgSettings = render.image_settings
 
             if not origin.chb_resOverride.isChecked():
-                ctx['scene'].render.resolution_percentage = int(origin.cb_scaling.currentText())
+                setIfChanged(render, "resolution_percentage", int(origin.cb_scaling.currentText()))
 
-            ctx['scene'].cycles.samples = int(rSettings["renderSamples"])
-            ctx['scene'].render.use_persistent_data = (rSettings["persData"])
-            ctx['scene'].render.use_compositing = rSettings["useComp"]
-            ctx['scene'].use_nodes = rSettings["useComp"]
+            setIfChanged(scene.cycles, "samples", int(rSettings["renderSamples"]))
+            setIfChanged(render, "use_persistent_data", rSettings["persData"])
+            setIfChanged(render, "use_compositing", rSettings["useComp"])
+            if self.hasUseNodes():
+                setIfChanged(scene, "use_nodes", rSettings["useComp"])
 
             selFileExt = rSettings["imageFormat"]
-                           
-            if selFileExt in [".exr", "exr", ".EXR", "EXR"]:
-                selFileExt = "OPEN_EXR"
-            elif selFileExt in [".exrMulti", "exrMulti"]:
-                selFileExt = "OPEN_EXR_MULTILAYER"
-            elif selFileExt in [".jpg", "jpg", ".JPG", "JPG", ".JPEG", "JPEG"]:
-                selFileExt = "JPEG"
-            elif selFileExt in [".png", "png", ".PNG", "PNG"]:
-                selFileExt = "PNG"
-
-            ctx['scene'].render.image_settings.file_format =  selFileExt
+            selFileExt = BLEND_FILE_FORMATS.get(selFileExt.lstrip(".").lower(), selFileExt)
+
+            setIfChanged(imgSettings, "file_format", selFileExt)
 
             if selFileExt in ["OPEN_EXR", "OPEN_EXR_MULTILAYER", "PNG"]:
 
                 if rSettings["useAlpha"]:
-                    ctx['scene'].render.image_settings.color_mode = "RGBA"
+                    setIfChanged(imgSettings, "color_mode", "RGBA")
                 else:
-                    ctx['scene'].render.image_settings.color_mode = "RGB"
+                    setIfChanged(imgSettings, "color_mode", "RGB")
 
                 if selFileExt in ["OPEN_EXR", "OPEN_EXR_MULTILAYER"]:
                     bitDepth = rSettings["exrBitDepth"]
                 elif selFileExt == "PNG":
                     bitDepth = rSettings["pngBitDepth"]
 
-                ctx['scene'].render.image_settings.color_depth = bitDepth
+                setIfChanged(imgSettings, "color_depth", bitDepth)
 
-                ctx['scene'].render.image_settings.exr_codec = rSettings["exrCodec"].upper()
+                setIfChanged(imgSettings, "exr_codec", rSettings["exrCodec"].upper())
 
             else:
-                ctx['scene'].render.image_settings.color_mode = "RGB"
+                setIfChanged(imgSettings, "color_mode", "RGB")
                 
 #    ^^^^^^^^^^^^^^^^^^^^^          ADDED       ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 #####################################################################################
@@ -573,7 +789,8 @@ class Prism_BlenderRender_Functions(object):
                 bpy.context.scene.frame_start = frameChunk[0]
                 bpy.context.scene.frame_end = frameChunk[1]
                 singleFrame = rSettings["rangeType"] == "Single Frame"
-                if bpy.app.version < (4, 0, 0):
+                #   temp_override exists from Blender 3.2, legacy ctx arg only before  #   EDITED
+                if not hasattr(bpy.context, "temp_override"):                       #   EDITED
 
                     self.blendPlugin.nextRenderslot()                               #   ADDED
 
@@ -607,7 +824,11 @@ class Prism_BlenderRender_Functions(object):
             if hasattr(origin, "waitmsg") and origin.waitmsg.isVisible():
                 origin.waitmsg.close()
 
-            if len(os.listdir(os.path.dirname(outputName))) > 0:
+            #   Stops at the first entry instead of listing every frame
+            with os.scandir(os.path.dirname(outputName)) as entries:               #   EDITED
+                hasFiles = next(entries, None) is not None
+
+            if hasFiles:                                                            #   EDITED
                 return "Result=Success"
             else:
                 return "unknown error (files do not exist)"
@@ -630,74 +851,37 @@ class Prism_BlenderRender_Functions(object):
     @err_catcher(name=__name__)
     def sm_render_undoRenderSettings(self, origin, rSettings):
 
-        import bpy, shutil                                                              #   ADDED
-
-        if "width" in rSettings:
-            bpy.context.scene.render.resolution_x = rSettings["width"]
-        if "height" in rSettings:
-            bpy.context.scene.render.resolution_y = rSettings["height"]
-        if "prev_start" in rSettings:
-            bpy.context.scene.frame_start = rSettings["prev_start"]
-        if "prev_end" in rSettings:
-            bpy.context.scene.frame_end = rSettings["prev_end"]
-        if "fileformat" in rSettings:
-            bpy.context.scene.render.image_settings.file_format = rSettings[
-                "fileformat"
-            ]
-        if "overwrite" in rSettings:
-            bpy.context.scene.render.use_overwrite = rSettings["overwrite"]
-        if "fileextension" in rSettings:
-            bpy.context.scene.render.use_file_extension = rSettings["fileextension"]
-        if "resolutionpercent" in rSettings:
-            bpy.context.scene.render.resolution_percentage = rSettings[
-                "resolutionpercent"
-            ]
+        #   Restores the settings saved in sm_render_preSubmit, in the order they are listed
+        scene = bpy.context.scene                                                       #   EDITED
+        settingOwners = {
+            "scene": scene,
+            "cycles": scene.cycles,
+            "render": scene.render,
+            "imgSettings": scene.render.image_settings,
+            }
+
+        for key, owner, attr in UNDO_RENDER_SETTINGS:
+            if key in rSettings:
+                setIfChanged(settingOwners[owner], attr, rSettings[key])
 
 #################################################################################
 #    vvvvvvvvvvvvvvvvvvvvv           ADDED         vvvvvvvvvvvvvvvvvvvvvvvvvvvvvv
 
-        if "origSamples" in rSettings:
-            bpy.context.scene.cycles.samples = rSettings["origSamples"]
-
-        if "origPersData" in rSettings:
-            bpy.context.scene.render.use_persistent_data = rSettings["origPersData"]
-
-        if "origUseComp" in rSettings:
-            bpy.context.scene.render.use_compositing = rSettings["origUseComp"]
-
-        if "origUseNode" in rSettings:
-            bpy.context.scene.use_nodes = rSettings["origUseNode"]
-
-        if "origImageformat" in rSettings:
-            bpy.context.scene.render.image_settings.file_format = rSettings["origImageformat"]
-
-        if "origExrCodec" in rSettings:
-            bpy.context.scene.render.image_settings.exr_codec = rSettings["origExrCodec"]
-
-        if "origBitDepth" in rSettings:
-            bpy.context.scene.render.image_settings.color_depth = rSettings["origBitDepth"]
-
-        if "origAlpha" in rSettings:
-            bpy.context.scene.render.image_settings.color_mode = rSettings["origAlpha"]
-
         if rSettings["overrideLayers"]:
             if "origLayers" in rSettings:
 
-                self.setupLayers(rSettings, mode="Restore")
+                self.restoreRenderLayers(rSettings)
+
+        self.restoreCyclesDevice(rSettings)
 
 #    ^^^^^^^^^^^^^^^^^^^^^          ADDED       ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 #####################################################################################
 
-        if platform.system() == "Windows":
-            tmpOutput = os.path.join(os.environ["temp"], "PrismRender")
-            if os.path.exists(tmpOutput):
-                try:
-                    shutil.rmtree(tmpOutput)
-                except:
-                    pass
+        if IS_WINDOWS:                                                                  #   EDITED
+            removeDirAsync(PRISM_TEMP_DIR)                                              #   EDITED
 
         bDir = os.path.dirname(rSettings["origOutputName"])
-        if os.path.exists(bDir) and len(os.listdir(bDir)) == 0:
+        if isEmptyDir(bDir):                                                            #   EDITED
             try:
                 shutil.rmtree(bDir)
             except:
@@ -710,10 +894,11 @@ class Prism_BlenderRender_Functions(object):
 
     @err_catcher(name=__name__)
     def sm_render_getRenderPasses(self, origin, renderLayer):                           #   EDITED
+        enabledAOVs = set(self.getViewLayerAOVs(renderLayer))                           #   ADDED
         aovNames = [
             x["name"]
             for x in self.getAvailableAOVs(renderLayer)                                 #   EDITED
-            if x["name"] not in self.getViewLayerAOVs(renderLayer)                      #   EDITED
+            if x["name"] not in enabledAOVs                                             #   EDITED
         ]
         return aovNames
 
@@ -744,8 +929,6 @@ class Prism_BlenderRender_Functions(object):
     @err_catcher(name=__name__)                                 #   ADDED
     def getRenderSamples(self, command, samples=None):
 
-        import bpy
-
         if command == "Status":
             samples = bpy.context.scene.cycles.samples
 
@@ -758,23 +941,72 @@ class Prism_BlenderRender_Functions(object):
     @err_catcher(name=__name__)                                 #   ADDED
     def useCompositor(self, command, useComp=False):
 
-        import bpy
-
         if command == "Status":
-            isChecked = bpy.context.scene.use_nodes
+            if self.hasUseNodes():
+                isChecked = bpy.context.scene.use_nodes
+            else:
+                isChecked = bpy.context.scene.render.use_compositing
 
             return isChecked
     
         elif command == "Set":
             bpy.context.scene.render.use_compositing = useComp
-            bpy.context.scene.use_nodes = useComp
+            if self.hasUseNodes():
+                bpy.context.scene.use_nodes = useComp
+
+
+    @err_catcher(name=__name__)                                 #   ADDED
+    def getViewLayer(self, renderLayer):
+
+        #   None if the layer was renamed or removed, callers must not fall
+        #   back to another layer as they would read or write the wrong passes.
+        viewLayer = bpy.context.scene.view_layers.get(renderLayer)
+        if viewLayer is None:
+            logger.warning(f"View layer not found: {renderLayer}")
+
+        return viewLayer
+
+
+    @err_catcher(name=__name__)                                 #   ADDED
+    def hasUseNodes(self):
+
+        #   Scene.use_nodes is deprecated in newer Blender, so it is only
+        #   probed once per session instead of on every compositor toggle.
+        if self.useNodesSupported is None:
+            self.useNodesSupported = "use_nodes" in bpy.types.Scene.bl_rna.properties
+
+        return self.useNodesSupported
+
+
+    @err_catcher(name=__name__)                                 #   ADDED
+    def hasMediaType(self):
+
+        #   ImageFormatSettings.media_type only exists in newer Blender
+        if self.mediaTypeSupported is None:
+            self.mediaTypeSupported = "media_type" in bpy.types.ImageFormatSettings.bl_rna.properties
+
+        return self.mediaTypeSupported
+
+
+    @err_catcher(name=__name__)                                 #   ADDED
+    def getCompNodeTree(self):
+
+        #   Newer Blender replaces Scene.node_tree with Scene.compositing_node_group.
+        #   The property is probed once instead of on every lookup.
+        if self.compGroupSupported is None:
+            self.compGroupSupported = (
+                "compositing_node_group" in bpy.types.Scene.bl_rna.properties
+                )
+
+        if self.compGroupSupported:
+            return bpy.context.scene.compositing_node_group
+        else:
+            return bpy.context.scene.node_tree
     
 
     @err_catcher(name=__name__)                                 #   ADDED
     def getPersistantData(self, command, usePD=False):
 
-        import bpy
-
         if command == "Status":
             isChecked = bpy.context.scene.render.use_persistent_data
 
@@ -787,14 +1019,7 @@ class Prism_BlenderRender_Functions(object):
     @err_catcher(name=__name__)                                 #   ADDED
     def getRenderLayers(self):
 
-        import bpy
-
-        renderLayers = []
-
-        for viewLayer in bpy.context.scene.view_layers:
-            layerName = viewLayer.name
-            renderLayers.append(layerName)
-
+        renderLayers = [viewLayer.name for viewLayer in bpy.context.scene.view_layers]
         currentLayer = bpy.context.view_layer.name
 
         return  renderLayers, currentLayer
@@ -803,18 +1028,38 @@ class Prism_BlenderRender_Functions(object):
     @err_catcher(name=__name__)                                 #   ADDED
     def setTempScene(self, rSettings, origin):    
 
-        import bpy
+        scene = bpy.context.scene
+        render = scene.render
+        imgSettings = render.image_settings
 
-        bpy.context.scene.render.resolution_percentage = int(origin.cb_scaling.currentText())
+        setIfChanged(render, "resolution_percentage", int(origin.cb_scaling.currentText()))
 
+        #   Written directly here rather than through the Status/Set accessors
         compEnabled = rSettings["useComp"]
-        self.useCompositor(command="Set", useComp=compEnabled)
+        setIfChanged(render, "use_compositing", compEnabled)
+        if self.hasUseNodes():
+            setIfChanged(scene, "use_nodes", compEnabled)
 
+        #   When opted in, multi-frame jobs keep the BVH and shaders between frames,
+        #   except with motion blur where persistent data can cause glitches
         persData = rSettings["persData"]
-        self.getPersistantData(command="Set", usePD=persData)
+        if rSettings["startFrame"] is None:
+            frameCount = len(rSettings["frames"])
+        else:
+            frameCount = rSettings["endFrame"] - rSettings["startFrame"] + 1
+
+        autoPersData = rSettings.get("autoPersData", False)
+        if autoPersData and not persData and frameCount > 1 and not render.use_motion_blur:
+            logger.info("Persistent Data enabled for this multi-frame render "
+                        "(no motion blur in the scene)")
+            persData = rSettings["persData"] = True
+
+        setIfChanged(render, "use_persistent_data", persData)
 
-        samples = int(rSettings["renderSamples"])
-        self.getRenderSamples(command="Set", samples=samples)
+        setIfChanged(scene.cycles, "samples", int(rSettings["renderSamples"]))
+
+        if rSettings.get("autoGPU", False):
+            self.enableCyclesGPU(rSettings)
 
         imageFormat = rSettings["imageFormat"]
         if rSettings["useAlpha"] == False:
@@ -822,91 +1067,155 @@ class Prism_BlenderRender_Functions(object):
         else:
             alpha = "RGBA"
 
-        if imageFormat == ".exr":
-            imageFormat = "OPEN_EXR"
-            bpy.context.scene.render.image_settings.file_format = imageFormat
-            bpy.context.scene.render.image_settings.exr_codec = rSettings["exrCodec"]
-            bpy.context.scene.render.image_settings.color_depth = rSettings["exrBitDepth"]
-            bpy.context.scene.render.image_settings.color_mode = alpha
-
-        elif imageFormat == ".exrMulti":
-            imageFormat = "OPEN_EXR_MULTILAYER"
-            bpy.context.scene.render.image_settings.file_format = imageFormat
-            bpy.context.scene.render.image_settings.exr_codec = rSettings["exrCodec"]
-            bpy.context.scene.render.image_settings.color_depth = rSettings["exrBitDepth"]
-            bpy.context.scene.render.image_settings.color_mode = alpha
-
-        elif imageFormat == ".png":
-            imageFormat = "PNG"
-            bpy.context.scene.render.image_settings.file_format = imageFormat
-            bpy.context.scene.render.image_settings.color_depth = rSettings["pngBitDepth"]
-            bpy.context.scene.render.image_settings.compression = rSettings["pngCompress"]
-            bpy.context.scene.render.image_settings.color_mode = alpha
-
-        elif imageFormat == ".jpg":
-            imageFormat = "JPEG"
-            bpy.context.scene.render.image_settings.file_format = imageFormat
-            bpy.context.scene.render.image_settings.quality = rSettings["jpegQual"]
+        if imageFormat not in TEMP_SCENE_FORMATS:
+            return
+
+        #   Media type and file format are set first as the other options depend on them
+        fileFormat = BLEND_FILE_FORMATS[imageFormat.lstrip(".").lower()]
+        applyFormatSettings = TEMP_SCENE_FORMATS[imageFormat]
+        if self.hasMediaType():
+            setIfChanged(imgSettings, "media_type", TEMP_SCENE_MEDIA_TYPES.get(imageFormat, "IMAGE"))
+
+        setIfChanged(imgSettings, "file_format", fileFormat)
+        applyFormatSettings(imgSettings, rSettings, alpha)
+
+
+    @err_catcher(name=__name__)                                 #   ADDED
+    def enableCyclesGPU(self, rSettings):
+
+        #   Switches Cycles to the first GPU backend with a usable device
+        scene = bpy.context.scene
+        if scene.render.engine != "CYCLES":
+            return
+
+        cyclesAddon = bpy.context.preferences.addons.get("cycles")
+        if cyclesAddon is None:
+            return
+
+        #   Leaves scenes and preferences alone where the user already chose a device
+        cyclesPrefs = cyclesAddon.preferences
+        origComputeType = cyclesPrefs.compute_device_type
+        if scene.cycles.device == "GPU" or origComputeType != "NONE":
+            return
+
+        #   OSL only runs on the CPU and OptiX
+        useOSL = scene.cycles.shading_system
+
+        for backend in CYCLES_GPU_BACKENDS:
+            if useOSL and backend != "OPTIX":
+                continue
+
+            try:
+                cyclesPrefs.compute_device_type = backend
+            except (TypeError, ValueError):
+                #   Backend is not part of this Blender build
+                continue
+
+            if hasattr(cyclesPrefs, "refresh_devices"):
+                cyclesPrefs.refresh_devices()
+            else:
+                cyclesPrefs.get_devices()
+
+            gpuDevices = [d for d in cyclesPrefs.devices if d.type == backend]
+            if not gpuDevices:
+                continue
+
+            #   Snapshot after the refresh so newly found devices are restored too
+            rSettings["origCyclesDevice"] = {
+                "device": scene.cycles.device,
+                "computeType": origComputeType,
+                "deviceUse": {d.id: d.use for d in cyclesPrefs.devices},
+                }
+
+            for device in gpuDevices:
+                device.use = True
+
+            scene.cycles.device = "GPU"
+            logger.debug(f"Cycles rendering on {backend}")
+            return
+
+        #   No GPU found, leaves the preferences as they were
+        cyclesPrefs.compute_device_type = origComputeType
+
+
+    @err_catcher(name=__name__)                                 #   ADDED
+    def restoreCyclesDevice(self, rSettings):
+
+        origDevice = rSettings.get("origCyclesDevice")
+        if not origDevice:
+            return
+
+        cyclesPrefs = bpy.context.preferences.addons["cycles"].preferences
+        cyclesPrefs.compute_device_type = origDevice["computeType"]
+        for device in cyclesPrefs.devices:
+            if device.id in origDevice["deviceUse"]:
+                device.use = origDevice["deviceUse"][device.id]
+
+        bpy.context.scene.cycles.device = origDevice["device"]
 
 
     @err_catcher(name=__name__)
     def nextRenderslot(self):
 
-        import bpy
+        #   Looked up on each call, as a held datablock reference is invalidated
+        #   by undo or loading a scenefile.
+        renderResult = bpy.data.images.get("Render Result")
+        if renderResult is None:
+            return
 
-        try:
-            bpy.data.images['Render Result'].render_slots.active_index += 1
-            bpy.data.images['Render Result'].render_slots.active_index %= 7
-        except:
-            pass
+        #   Cycles through every slot, Blender has 8 by default but they can be added or removed
+        slots = renderResult.render_slots
+        slots.active_index = (slots.active_index + 1) % len(slots)
 
 
     @err_catcher(name=__name__)
     def setupLayers(self, rSettings, mode):
 
-        import bpy
+        #   Kept for callers using the mode argument
+        if mode == "Set":
+            return self.setRenderLayers(rSettings)
+
+        if mode == "Restore":
+            return self.restoreRenderLayers(rSettings)
         
-        overrideLayers = rSettings["overrideLayers"]
-        renderLayer = rSettings["renderLayer"]
+        return rSettings
 
-        if mode == "Set":
-            origLayers = {}
-
-            #   Iterates through all layers Render and saves the orig state.
-            for vl in bpy.context.scene.view_layers:
-                origLayers[vl.name] = vl.use
-
-            #   Saves the dict to rSettings
-            rSettings["origLayers"] = origLayers
-
-            #   If overrideLayers is checked, will set the layers
-            if overrideLayers:
-                singleLayer = rSettings["renderLayer"] 
-                disabledLayers = set()
-                tempLayers = {}
-
-                #   Will disable all layers execpt the selected single layer
-                for vl in bpy.context.scene.view_layers:
-                    if vl.name != singleLayer:
-                        disabledLayers.add(vl.name)
-                        vl.use = False
-                        
-                    else:
-                        vl.use = True         
 
-                    tempLayers[vl.name] = vl.use            
+    @err_catcher(name=__name__)                                 #   ADDED
+    def setRenderLayers(self, rSettings):
 
-                rSettings["tempLayers"] = tempLayers
+        #   Nothing is changed or restored without the override
+        if not rSettings["overrideLayers"]:
+            rSettings["origLayers"] = {}
+            return rSettings
 
-        if mode == "Restore":
-            # Get orig layer config
-            origLayers = rSettings.get("origLayers", {})
-
-            #   Set the layer to the original state
-            for vl in bpy.context.scene.view_layers:
-                vl_name = vl.name
-                origUse = origLayers.get(vl_name, False)
-                vl.use = origUse
+        origLayers = {}
+        singleLayer = rSettings["renderLayer"] 
+
+        #   Saves the orig state of each layer and disables all layers
+        #   execpt the selected single layer, in one pass.
+        for vl in bpy.context.scene.view_layers:
+            vlName = vl.name
+            origLayers[vlName] = vl.use
+            vl.use = vlName == singleLayer
+
+        #   Saves the dict to rSettings
+        rSettings["origLayers"] = origLayers
+
+        return rSettings
+
+
+    @err_catcher(name=__name__)                                 #   ADDED
+    def restoreRenderLayers(self, rSettings):
+
+        # Get orig layer config
+        origLayers = rSettings.get("origLayers", {})
+        if not origLayers:
+            return rSettings
+
+        #   Set the layer to the original state
+        for vl in bpy.context.scene.view_layers:
+            vl.use = origLayers.get(vl.name, False)
         
         return rSettings
 
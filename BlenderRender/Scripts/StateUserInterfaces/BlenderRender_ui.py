@@ -660,6 +660,36 @@ class Ui_wg_BlenderRender(object):
 
         self.f_midMidRt.addLayout(self.f_midMidRt_2)
 
+        self.f_midMidRt_3 = QHBoxLayout()
+        self.f_midMidRt_3.setObjectName(u"f_midMidRt_3")
+        self.chb_autoGPU = QCheckBox(self.gb_BlenderRender)
+        self.chb_autoGPU.setObjectName(u"chb_autoGPU")
+        self.chb_autoGPU.setLayoutDirection(Qt.RightToLeft)
+
+        self.f_midMidRt_3.addWidget(self.chb_autoGPU)
+
+        self.horizontalSpacer_45 = QSpacerItem(40, 20, QSizePolicy.Fixed, QSizePolicy.Minimum)
+
+        self.f_midMidRt_3.addItem(self.horizontalSpacer_45)
+
+
+        self.f_midMidRt.addLayout(self.f_midMidRt_3)
+
+        self.f_midMidRt_4 = QHBoxLayout()
+        self.f_midMidRt_4.setObjectName(u"f_midMidRt_4")
+        self.chb_autoPersData = QCheckBox(self.gb_BlenderRender)
+        self.chb_autoPersData.setObjectName(u"chb_autoPersData")
+        self.chb_autoPersData.setLayoutDirection(Qt.RightToLeft)
+
+        self.f_midMidRt_4.addWidget(self.chb_autoPersData)
+
+        self.horizontalSpacer_46 = QSpacerItem(40, 20, QSizePolicy.Fixed, QSizePolicy.Minimum)
+
+        self.f_midMidRt_4.addItem(self.horizontalSpacer_46)
+
+
+        self.f_midMidRt.addLayout(self.f_midMidRt_4)
+
 
         self.f_midPanelMid.addLayout(self.f_midMidRt)
 
@@ -1148,6 +1178,8 @@ class Ui_wg_BlenderRender(object):
         self.chb_compositor.setText(QCoreApplication.translate("wg_BlenderRender", u"Compositor:  ", None))
         self.l_fileCompress.setText(QCoreApplication.translate("wg_BlenderRender", u"Codec:     ", None))
         self.chb_persData.setText(QCoreApplication.translate("wg_BlenderRender", u"Persistent Data:", None))
+        self.chb_autoGPU.setText(QCoreApplication.translate("wg_BlenderRender", u"Auto GPU:", None))
+        self.chb_autoPersData.setText(QCoreApplication.translate("wg_BlenderRender", u"Auto Persistent Data:", None))
         self.l_bitDepth.setText(QCoreApplication.translate("wg_BlenderRender", u"Bit Depth:  ", None))
         self.chb_alpha.setText(QCoreApplication.translate("wg_BlenderRender", u"Alpha:  ", None))
         self.gb_passes.setTitle(QCoreApplication.translate("wg_BlenderRender", u"Render Passes", None))